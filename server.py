@@ -1,20 +1,97 @@
-from typing import Optional, Dict, Any, List
+import asyncio
+import functools
+import multiprocessing
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Dict, Any, List, Tuple
 
 from pathlib import Path
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
 
-from word_document_editor import WordDocumentEditor
+from word_document_editor import run_in_worker
 
 
 mcp = FastMCP("Office Document Server") 
-docx_editor_instance = WordDocumentEditor() 
 
-async def run_sync_tool(func, *args, **kwargs):
-    return func(*args, **kwargs)
+
+class SessionManager:
+    """
+    Gives every MCP session its own editor worker process, so documents in different sessions
+    are edited in parallel and python-docx work never runs on the event loop.
+    Each session gets a single-worker pool: calls run in order and always reach the process
+    that holds that session's document.
+    At most max_sessions workers are kept alive. A new session beyond that is refused with an
+    error rather than discarding another session's unsaved document; a slot frees up when a
+    session ends (its session object is garbage collected) or its worker dies.
+    """
+    def __init__(self, max_sessions: int = 8):
+        if max_sessions < 1:
+            raise ValueError("max_sessions must be at least 1.")
+        self.max_sessions = max_sessions
+        self._executors: Dict[Optional[int], ProcessPoolExecutor] = {}
+        self._mp_context = multiprocessing.get_context("spawn")
+
+    def _executor_for(self, ctx: Context) -> Tuple[Optional[int], ProcessPoolExecutor]:
+        try:
+            session = ctx.session
+        except (AttributeError, ValueError):
+            # Called outside an MCP request (e.g. directly); such calls share one default worker.
+            session = None
+        key = None if session is None else id(session)
+        executor = self._executors.get(key)
+        if executor is None:
+            if len(self._executors) >= self.max_sessions:
+                raise RuntimeError(
+                    f"Too many active document sessions (limit {self.max_sessions}). "
+                    "Try again after another client disconnects."
+                )
+            executor = self._executors[key] = ProcessPoolExecutor(max_workers=1, mp_context=self._mp_context)
+            if session is not None:
+                weakref.finalize(session, self._drop, key)
+        return key, executor
+
+    def _drop(self, key: Optional[int], executor: Optional[ProcessPoolExecutor] = None) -> None:
+        """Shuts down the session's worker; if executor is given, only when it is still the current one."""
+        current = self._executors.get(key)
+        if current is None or (executor is not None and current is not executor):
+            return
+        del self._executors[key]
+        # Only reached once nobody can be waiting on this worker: its session is gone, or the
+        # pool is already broken and its pending calls have failed.
+        current.shutdown(wait=False, cancel_futures=True)
+
+    async def call(self, ctx: Context, method_name: str, **kwargs) -> Tuple[Any, Optional[str]]:
+        """Runs a WordDocumentEditor method in the session's worker; returns (result, current_filename)."""
+        key, executor = self._executor_for(ctx)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(executor, functools.partial(run_in_worker, method_name, kwargs))
+        except BrokenProcessPool:
+            # The worker died (OOM, crash, kill); forget it so the next call starts a fresh one.
+            self._drop(key, executor)
+            raise RuntimeError(
+                "The document worker for this session stopped unexpectedly and the in-memory document was lost. "
+                "Create or load the document again."
+            ) from None
+
+
+sessions = SessionManager()
+
+def mcp_tool_safe(fn):
+    """Turns any exception raised by a tool into the standard error response."""
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await fn(*args, **kwargs)
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+    return wrapper
 
 
 @mcp.tool()
-async def create_docx_document(filename: str = "new_document.docx") -> Dict[str, Any]:
+@mcp_tool_safe
+async def create_docx_document(ctx: Context, filename: str = "new_document.docx") -> Dict[str, Any]:
     """
     Creates a new, blank Word document (.docx) in memory.
     Args:
@@ -22,14 +99,12 @@ async def create_docx_document(filename: str = "new_document.docx") -> Dict[str,
     Returns:
         Dict: Status message and current filename.
     """
-    try:
-        message = await run_sync_tool(docx_editor_instance.create_document, filename=filename)
-        return {"status": "success", "message": message, "current_filename": docx_editor_instance.current_filename}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+    message, current_filename = await sessions.call(ctx, "create_document", filename=filename)
+    return {"status": "success", "message": message, "current_filename": current_filename}
 
 @mcp.tool()
-async def load_docx_document(filename: str) -> Dict[str, Any]:
+@mcp_tool_safe
+async def load_docx_document(ctx: Context, filename: str) -> Dict[str, Any]:
     """
     Loads an existing Word document (.docx) from 'documents_fastmcp' into memory.
     Args:
@@ -37,16 +112,12 @@ async def load_docx_document(filename: str) -> Dict[str, Any]:
     Returns:
         Dict: Status message and current filename.
     """
-    try:
-        message = await run_sync_tool(docx_editor_instance.load_document, filename=filename)
-        return {"status": "success", "message": message, "current_filename": docx_editor_instance.current_filename}
-    except FileNotFoundError as e:
-        return {"status": "error", "message": str(e)}
-    except Exception as e:
-        return {"status": "error", "message": f"An unexpected error occurred: {str(e)}"}
+    message, current_filename = await sessions.call(ctx, "load_document", filename=filename)
+    return {"status": "success", "message": message, "current_filename": current_filename}
 
 @mcp.tool()
-async def save_docx_document(filename: Optional[str] = None) -> Dict[str, Any]:
+@mcp_tool_safe
+async def save_docx_document(ctx: Context, filename: Optional[str] = None) -> Dict[str, Any]:
     """
     Saves the current in-memory Word document (.docx) to 'documents_fastmcp'.
     Args:
@@ -54,14 +125,12 @@ async def save_docx_document(filename: Optional[str] = None) -> Dict[str, Any]:
     Returns:
         Dict: Status message and saved filename.
     """
-    try:
-        message = await run_sync_tool(docx_editor_instance.save_document, filename=filename)
-        return {"status": "success", "message": message, "saved_filename": docx_editor_instance.current_filename}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+    message, saved_filename = await sessions.call(ctx, "save_document", filename=filename)
+    return {"status": "success", "message": message, "saved_filename": saved_filename}
 
 @mcp.tool()
-async def add_docx_paragraph(text: str, style: Optional[str] = None) -> Dict[str, Any]:
+@mcp_tool_safe
+async def add_docx_paragraph(ctx: Context, text: str, style: Optional[str] = None) -> Dict[str, Any]:
     """
     Adds a paragraph to the Word document.
     Args:
@@ -70,14 +139,12 @@ async def add_docx_paragraph(text: str, style: Optional[str] = None) -> Dict[str
     Returns:
         Dict: Status, message, and details of the added paragraph.
     """
-    try:
-        para_info = await run_sync_tool(docx_editor_instance.add_paragraph, text=text, style=style)
-        return {"status": "success", "message": "Paragraph added to Word document.", "data": para_info}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+    para_info, _ = await sessions.call(ctx, "add_paragraph", text=text, style=style)
+    return {"status": "success", "message": "Paragraph added to Word document.", "data": para_info}
 
 @mcp.tool()
-async def add_docx_heading(text: str, level: int = 1) -> Dict[str, Any]:
+@mcp_tool_safe
+async def add_docx_heading(ctx: Context, text: str, level: int = 1) -> Dict[str, Any]:
     """
     Adds a heading to the Word document.
     Args:
@@ -86,14 +153,13 @@ async def add_docx_heading(text: str, level: int = 1) -> Dict[str, Any]:
     Returns:
         Dict: Status, message, and details of the added heading.
     """
-    try:
-        heading_info = await run_sync_tool(docx_editor_instance.add_heading, text=text, level=level)
-        return {"status": "success", "message": "Heading added to Word document.", "data": heading_info}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+    heading_info, _ = await sessions.call(ctx, "add_heading", text=text, level=level)
+    return {"status": "success", "message": "Heading added to Word document.", "data": heading_info}
 
 @mcp.tool()
+@mcp_tool_safe
 async def add_docx_styled_text_paragraph(
+    ctx: Context,
     text_runs: List[Dict[str, Any]], 
     paragraph_style: Optional[str] = None
 ) -> Dict[str, Any]:
@@ -107,22 +173,47 @@ async def add_docx_styled_text_paragraph(
     Returns:
         Dict: Status, message, and the combined text of the added paragraph.
     """
-    try:
-        # Basic validation for text_runs structure
-        if not isinstance(text_runs, list) or not all(isinstance(run, dict) and "text" in run for run in text_runs):
-            return {"status": "error", "message": "text_runs must be a list of dictionaries, each with a 'text' key."}
-        
-        added_text = await run_sync_tool(
-            docx_editor_instance.add_styled_text_to_paragraph, 
-            text_runs=text_runs, 
-            paragraph_style=paragraph_style
-        )
-        return {"status": "success", "message": "Styled text paragraph added to Word document.", "data": {"full_text": added_text}}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+    # text_runs structure is validated by the editor, shared with the batch tool's styled_text ops.
+    added_text, _ = await sessions.call(
+        ctx,
+        "add_styled_text_to_paragraph",
+        text_runs=text_runs,
+        paragraph_style=paragraph_style
+    )
+    return {"status": "success", "message": "Styled text paragraph added to Word document.", "data": {"full_text": added_text}}
 
 @mcp.tool()
-async def add_docx_table(rows: int, cols: int, data_list: Optional[List[List[str]]] = None, style: Optional[str] = 'TableGrid') -> Dict[str, Any]:
+@mcp_tool_safe
+async def add_docx_styled_text_paragraph_columns(
+    ctx: Context,
+    runs: Dict[str, List[Any]],
+    paragraph_style: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Adds a paragraph to Word doc with multiple styled text runs given column-wise.
+    runs maps each property to a list with one entry per run: {"text": [str], "bold": [bool], "italic": [bool],
+                                      "font_size_pt": [int], "font_name": [str], "font_color_rgb": [[R,G,B]]}
+    Only "text" is required; use null for entries that should stay unstyled.
+    Args:
+        runs (Dict[str, List[Any]]): Column lists of run properties, all the same length as runs["text"].
+        paragraph_style (str, optional): Style for the entire paragraph.
+    Returns:
+        Dict: Status, message, and the combined text of the added paragraph.
+    """
+    if not isinstance(runs, dict) or not isinstance(runs.get("text"), list):
+        return {"status": "error", "message": "runs must be a dictionary with a 'text' list."}
+
+    added_text, _ = await sessions.call(
+        ctx,
+        "add_styled_text_to_paragraph_soa",
+        runs_soa=runs,
+        paragraph_style=paragraph_style
+    )
+    return {"status": "success", "message": "Styled text paragraph added to Word document.", "data": {"full_text": added_text}}
+
+@mcp.tool()
+@mcp_tool_safe
+async def add_docx_table(ctx: Context, rows: int, cols: int, data_list: Optional[List[List[str]]] = None, style: Optional[str] = 'TableGrid') -> Dict[str, Any]:
     """
     Adds a table to the Word document.
     Args:
@@ -133,14 +224,12 @@ async def add_docx_table(rows: int, cols: int, data_list: Optional[List[List[str
     Returns:
         Dict: Status, message, and details of the added table.
     """
-    try:
-        table_info = await run_sync_tool(docx_editor_instance.add_table, rows=rows, cols=cols, data_list=data_list, style=style)
-        return {"status": "success", "message": "Table added to Word document.", "data": table_info}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+    table_info, _ = await sessions.call(ctx, "add_table", rows=rows, cols=cols, data_list=data_list, style=style)
+    return {"status": "success", "message": "Table added to Word document.", "data": table_info}
 
 @mcp.tool()
-async def add_docx_picture(image_path: str, width_inch: Optional[float] = None, height_inch: Optional[float] = None) -> Dict[str, Any]:
+@mcp_tool_safe
+async def add_docx_picture(ctx: Context, image_path: str, width_inch: Optional[float] = None, height_inch: Optional[float] = None) -> Dict[str, Any]:
     """
     Adds a picture to the Word document from a server-accessible local path.
     Args:
@@ -153,25 +242,56 @@ async def add_docx_picture(image_path: str, width_inch: Optional[float] = None,
     # SECURITY WARNING: Ensure image_path is validated or restricted to prevent access to arbitrary files.
     # For this example, we assume the LLM provides safe paths or paths are pre-validated.
     try:
-        message = await run_sync_tool(docx_editor_instance.add_picture, image_path=image_path, width_inch=width_inch, height_inch=height_inch)
-        return {"status": "success", "message": message}
+        message, _ = await sessions.call(ctx, "add_picture", image_path=image_path, width_inch=width_inch, height_inch=height_inch)
     except FileNotFoundError:
         return {"status": "error", "message": f"Image file not found at path: {image_path}. Ensure the path is correct and accessible by the server."}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+    return {"status": "success", "message": message}
 
 @mcp.tool()
-async def add_docx_page_break() -> Dict[str, Any]:
+@mcp_tool_safe
+async def add_docx_page_break(ctx: Context) -> Dict[str, Any]:
     """
     Adds a manual page break to the Word document.
     Returns:
         Dict: Status and message.
     """
-    try:
-        message = await run_sync_tool(docx_editor_instance.add_page_break)
-        return {"status": "success", "message": message}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+    message, _ = await sessions.call(ctx, "add_page_break")
+    return {"status": "success", "message": message}
+
+@mcp.tool()
+@mcp_tool_safe
+async def apply_docx_operations(ctx: Context, ops: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Applies several edits to the Word document in one call, in order.
+    Each op is a dict with a "kind" plus the arguments of the matching tool:
+        {"kind": "paragraph", "text": "str", "style": "str"}
+        {"kind": "heading", "text": "str", "level": int}
+        {"kind": "styled_text", "text_runs": [...], "paragraph_style": "str"}
+        {"kind": "table", "rows": int, "cols": int, "data_list": [[...]], "style": "str"}
+        {"kind": "picture", "image_path": "str", "width_inch": float, "height_inch": float}
+        {"kind": "page_break"}
+    Args:
+        ops (List[Dict[str, Any]]): Operations to apply. Ops before a failing one remain applied.
+    Returns:
+        Dict: Status, message, and the per-operation results.
+    """
+    if not isinstance(ops, list) or not all(isinstance(op, dict) for op in ops):
+        return {"status": "error", "message": "ops must be a list of dictionaries, each with a 'kind' key."}
+
+    results, _ = await sessions.call(ctx, "apply_ops", ops=ops)
+    return {"status": "success", "message": f"{len(results)} operations applied to Word document.", "data": results}
+
+@mcp.tool()
+@mcp_tool_safe
+async def close_docx_document(ctx: Context) -> Dict[str, Any]:
+    """
+    Closes the current Word document without saving and frees its memory.
+    Call save_docx_document() first to keep changes.
+    Returns:
+        Dict: Status and message.
+    """
+    message, _ = await sessions.call(ctx, "close")
+    return {"status": "success", "message": message}
 
 if __name__ == "__main__":
     mcp.run("stdio")
@@ -0,0 +1,341 @@
+import os
+import pickle
+import struct
+import tempfile
+import unittest
+import zipfile
+import zlib
+
+import docx
+
+_ORIGINAL_CWD = os.getcwd()
+_IMPORT_DIR = tempfile.TemporaryDirectory()
+# Importing the editor creates its upload folder in the working directory; keep that out of the repo.
+os.chdir(_IMPORT_DIR.name)
+try:
+    import word_document_editor
+    from word_document_editor import WordDocumentEditor, run_in_worker
+finally:
+    os.chdir(_ORIGINAL_CWD)
+
+
+def _one_pixel_png():
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    header = struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(b"\x00\xff\xff\xff")) + chunk(b"IEND", b""))
+
+
+def _saved_paragraphs(path):
+    return [p.text for p in docx.Document(path).paragraphs]
+
+
+class CreateSaveRoundTripTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.editor = WordDocumentEditor()
+
+    def _path(self, name):
+        return os.path.join(self._tmp.name, name)
+
+    def test_created_document_saves_added_content(self):
+        path = self._path("round_trip.docx")
+        self.editor.create_document(path)
+        self.editor.add_heading("Title", level=1)
+        self.editor.add_paragraph("hello")
+        self.editor.add_styled_text_to_paragraph([{"text": "styled", "bold": True}])
+        self.editor.add_table(1, 2, [["a", "b"]])
+        self.editor.save_document()
+
+        self.assertEqual(_saved_paragraphs(path), ["", "Title", "hello", "styled"])
+        self.assertEqual(len(docx.Document(path).tables), 1)
+
+        self.editor.load_document(path)
+        self.assertEqual([p.text for p in self.editor.doc.paragraphs], ["", "Title", "hello", "styled"])
+
+    def test_save_recreates_a_removed_directory(self):
+        path = self._path(os.path.join("nested", "saved.docx"))
+        self.editor.create_document(path)
+        self.editor.save_document()
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+
+        self.editor.add_paragraph("after removal")
+        self.editor.save_document()
+
+        self.assertEqual(_saved_paragraphs(path), ["", "after removal"])
+
+    def test_loading_a_non_docx_file_names_the_path(self):
+        path = self._path("not_a_docx.docx")
+        with open(path, "w") as f:
+            f.write("plain text")
+        with self.assertRaisesRegex(zipfile.BadZipFile, "not_a_docx.docx"):
+            self.editor.load_document(path)
+
+    def test_each_created_document_starts_empty(self):
+        first = self._path("first.docx")
+        second = self._path("second.docx")
+        self.editor.create_document(first)
+        self.editor.add_paragraph("only in first")
+        self.editor.save_document()
+        self.editor.create_document(second)
+        self.editor.save_document()
+
+        self.assertEqual(_saved_paragraphs(first), ["", "only in first"])
+        self.assertEqual(_saved_paragraphs(second), [""])
+
+
+class AddPictureTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.editor = WordDocumentEditor()
+        self.editor.create_document(os.path.join(self._tmp.name, "pictures.docx"))
+
+    def _paragraph_count(self):
+        return len(self.editor.doc.paragraphs)
+
+    def test_missing_image_raises_file_not_found(self):
+        with self.assertRaises(FileNotFoundError):
+            self.editor.add_picture(os.path.join(self._tmp.name, "missing.png"))
+        self.assertEqual(self._paragraph_count(), 1)
+
+    def test_unreadable_path_raises_value_error(self):
+        with self.assertRaisesRegex(ValueError, "Could not add picture"):
+            self.editor.add_picture(self._tmp.name)
+        self.assertEqual(self._paragraph_count(), 1)
+
+    def test_picture_keeps_its_file_name(self):
+        path = os.path.join(self._tmp.name, "photo.png")
+        with open(path, "wb") as f:
+            f.write(_one_pixel_png())
+        self.assertEqual(self.editor.add_picture(path, width_inch=1), "Picture added from 'photo.png'.")
+
+        names = self.editor.doc.element.body.xpath(".//pic:cNvPr/@name")
+        self.assertEqual(names, ["photo.png"])
+        self.assertEqual(self.editor.doc.inline_shapes[0].width.inches, 1)
+
+
+class StyledTextColumnsTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.editor = WordDocumentEditor()
+        self.editor.create_document(os.path.join(self._tmp.name, "columns.docx"))
+
+    def test_column_length_mismatch_is_rejected(self):
+        paragraphs_before = len(self.editor.doc.paragraphs)
+        for italic in ([True], []):
+            with self.assertRaisesRegex(ValueError, "Column 'italic'"):
+                self.editor.add_styled_text_to_paragraph_soa({"text": ["a", "b"], "italic": italic})
+        self.assertEqual(len(self.editor.doc.paragraphs), paragraphs_before)
+
+    def test_none_entries_leave_runs_unstyled(self):
+        full_text = self.editor.add_styled_text_to_paragraph_soa({
+            "text": ["styled", "plain"],
+            "bold": [True, None],
+            "font_size_pt": [14, None],
+            "font_color_rgb": [[255, 0, 0], None],
+        })
+        self.assertEqual(full_text, "styledplain")
+
+        styled, plain = self.editor.doc.paragraphs[-1].runs
+        self.assertTrue(styled.bold)
+        self.assertEqual(styled.font.size.pt, 14)
+        self.assertEqual(str(styled.font.color.rgb), "FF0000")
+        self.assertIsNone(plain.bold)
+        self.assertIsNone(plain.font.size)
+        self.assertIsNone(plain._r.rPr)
+
+
+class RunStyleCacheTest(unittest.TestCase):
+    STYLED = {"italic": True, "font_size_pt": 13, "font_name": "Arial", "font_color_rgb": [0, 128, 255]}
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.path = os.path.join(self._tmp.name, "styles.docx")
+        self.editor = WordDocumentEditor()
+        self.editor.create_document(self.path)
+
+    def _styled_runs(self, *texts):
+        return [dict(self.STYLED, text=text) for text in texts]
+
+    def assertStyled(self, run):
+        self.assertTrue(run.italic)
+        self.assertIsNone(run.bold)
+        self.assertEqual(run.font.size.pt, 13)
+        self.assertEqual(run.font.name, "Arial")
+        self.assertEqual(str(run.font.color.rgb), "0080FF")
+
+    def test_repeated_styles_survive_save_and_reopen(self):
+        self.editor.add_styled_text_to_paragraph(self._styled_runs("a", "b") + [{"text": "plain"}])
+        self.editor.add_styled_text_to_paragraph(self._styled_runs("c") + [{"text": "bold", "bold": True}])
+        self.editor.save_document()
+
+        first, second = docx.Document(self.path).paragraphs[1:]
+        self.assertEqual([r.text for r in first.runs], ["a", "b", "plain"])
+        self.assertStyled(first.runs[0])
+        self.assertStyled(first.runs[1])
+        self.assertIsNone(first.runs[2]._r.rPr)
+        self.assertStyled(second.runs[0])
+        self.assertTrue(second.runs[1].bold)
+        self.assertIsNone(second.runs[1].italic)
+        self.assertIsNone(second.runs[1].font.size)
+
+    def test_cloned_run_properties_are_independent(self):
+        self.editor.add_styled_text_to_paragraph(self._styled_runs("a", "b"))
+        first, second = self.editor.doc.paragraphs[-1].runs
+        self.assertIsNot(first._r.rPr, second._r.rPr)
+        second.font.size = docx.shared.Pt(20)
+        self.assertEqual(first.font.size.pt, 13)
+
+    def test_styles_after_load_document(self):
+        self.editor.add_styled_text_to_paragraph(self._styled_runs("before"))
+        self.editor.save_document()
+        self.editor.load_document(self.path)
+        self.editor.add_styled_text_to_paragraph(self._styled_runs("after", "again"))
+        self.editor.save_document()
+
+        paragraphs = docx.Document(self.path).paragraphs
+        self.assertEqual([p.text for p in paragraphs], ["", "before", "afteragain"])
+        for run in paragraphs[1].runs + paragraphs[2].runs:
+            self.assertStyled(run)
+
+
+class ApplyOpsTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.editor = WordDocumentEditor()
+        self.editor.create_document(os.path.join(self._tmp.name, "ops.docx"))
+
+    def _texts(self):
+        return [p.text for p in self.editor.doc.paragraphs]
+
+    def test_results_follow_op_order(self):
+        results = self.editor.apply_ops([
+            {"kind": "heading", "text": "Head", "level": 2},
+            {"kind": "paragraph", "text": "Body"},
+            {"kind": "styled_text", "text_runs": [{"text": "Bold", "bold": True}]},
+            {"kind": "table", "rows": 1, "cols": 1, "data_list": [["cell"]]},
+            {"kind": "page_break"},
+        ])
+        self.assertEqual(results, [
+            {"text_added": "Head", "level": 2},
+            {"text_added": "Body", "style_applied": "Normal (default)"},
+            "Bold",
+            {"rows": 1, "cols": 1, "style": "TableGrid", "data_populated": True},
+            "Page break added.",
+        ])
+        self.assertEqual(self._texts()[:4], ["", "Head", "Body", "Bold"])
+
+    def test_unknown_kind_is_rejected(self):
+        with self.assertRaisesRegex(ValueError, "Operation 0 has unknown kind 'chart'"):
+            self.editor.apply_ops([{"kind": "chart"}])
+        self.assertEqual(self._texts(), [""])
+
+    def test_failure_keeps_earlier_ops(self):
+        with self.assertRaisesRegex(ValueError, r"Operation 1 \('heading'\) failed"):
+            self.editor.apply_ops([
+                {"kind": "paragraph", "text": "kept"},
+                {"kind": "heading", "text": "bad", "level": 12},
+                {"kind": "paragraph", "text": "never added"},
+            ])
+        self.assertEqual(self._texts(), ["", "kept"])
+
+    def test_styled_text_runs_are_validated(self):
+        for text_runs in ([{"txt": "typo"}], ["abc"], "abc"):
+            with self.assertRaisesRegex(ValueError, "each with a 'text' key"):
+                self.editor.apply_ops([{"kind": "styled_text", "text_runs": text_runs}])
+        self.assertEqual(self._texts(), [""])
+
+
+class CloseDocumentTest(unittest.TestCase):
+    def test_close_drops_the_document(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "closed.docx")
+            editor = WordDocumentEditor()
+            editor.create_document(path)
+            editor.add_paragraph("unsaved")
+
+            self.assertIn("closed", editor.close())
+            self.assertIsNone(editor.doc)
+            self.assertIsNone(editor.current_filename)
+            with self.assertRaisesRegex(ValueError, "No document loaded"):
+                editor.add_paragraph("after close")
+            with self.assertRaisesRegex(ValueError, "No document loaded"):
+                editor.save_document(path)
+            self.assertFalse(os.path.exists(path))
+
+    def test_close_without_document(self):
+        self.assertEqual(WordDocumentEditor().close(), "No document was open.")
+
+    def test_documents_work_after_close(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "reopened.docx")
+            editor = WordDocumentEditor()
+            editor.create_document(path)
+            editor.close()
+            editor.create_document(path)
+            editor.add_paragraph("fresh")
+            editor.save_document()
+            self.assertEqual(_saved_paragraphs(path), ["", "fresh"])
+
+
+class RunInWorkerTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+
+    def _path(self, name):
+        return os.path.join(self._tmp.name, name)
+
+    def test_corrupt_document_error_can_be_pickled(self):
+        good, corrupt = self._path("good.docx"), self._path("corrupt.docx")
+        docx.Document().save(good)
+        with zipfile.ZipFile(good) as src, zipfile.ZipFile(corrupt, "w") as dst:
+            for item in src.infolist():
+                data = src.read(item)
+                if item.filename == "word/document.xml":
+                    data = data[:len(data) // 2]
+                dst.writestr(item, data)
+
+        with self.assertRaises(ValueError) as caught:
+            run_in_worker("load_document", {"filename": corrupt})
+        restored = pickle.loads(pickle.dumps(caught.exception))
+        self.assertIsInstance(restored, ValueError)
+        self.assertIn("expected", str(restored))
+
+    def test_missing_file_stays_file_not_found(self):
+        with self.assertRaises(FileNotFoundError) as caught:
+            run_in_worker("load_document", {"filename": self._path("missing.docx")})
+        self.assertIn("missing.docx", str(pickle.loads(pickle.dumps(caught.exception))))
+
+    def test_returns_result_and_current_filename(self):
+        path = self._path("worker.docx")
+        message, current_filename = run_in_worker("create_document", {"filename": path})
+        self.assertIn("created", message)
+        self.assertEqual(current_filename, path)
+
+
+class TemplateDocumentTest(unittest.TestCase):
+    def test_template_is_not_touched_by_editing(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            editor = WordDocumentEditor()
+            editor.create_document(os.path.join(tmp, "scratch.docx"))
+            editor.add_paragraph("scratch", style="Heading 1")
+            editor.add_table(1, 1, [["cell"]])
+
+        template = word_document_editor._TEMPLATE_DOC
+        # A cached _Body wrapper would be deep-copied detached from each new document's root.
+        # Read the private slot directly: the public _body property would create the wrapper.
+        self.assertIsNone(vars(template)["_Document__body"])
+        body = template.element.body
+        self.assertEqual([child.tag.rsplit("}", 1)[-1] for child in body], ["sectPr"])
+
+
+if __name__ == "__main__":
+    unittest.main()
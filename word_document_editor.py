@@ -1,4 +1,10 @@
+import copy
+import functools
+import gc
+import io
 import os
+import pathlib
+import zipfile
 
 import docx
 from docx.shared import Inches as DocxInches, Pt as DocxPt
@@ -6,8 +12,43 @@ from docx.shared import RGBColor as DocxRGBColor
 from typing import Optional, Dict, Any, List
 
 UPLOAD_FOLDER_DOCX = 'documents_fastmcp' # New folder for Word documents
-if not os.path.exists(UPLOAD_FOLDER_DOCX):
-    os.makedirs(UPLOAD_FOLDER_DOCX)
+UPLOAD_DIR = pathlib.Path(UPLOAD_FOLDER_DOCX).resolve()
+UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+# Directories already known to exist, so repeated saves skip the stat/makedirs calls.
+_known_dirs = {str(UPLOAD_DIR)}
+
+
+# Parsed once; create_document deep-copies it instead of re-reading the default template.
+# Never access this through the Document API (.paragraphs, .add_*, .styles, ...): python-docx caches
+# wrapper objects holding inner XML elements, and deepcopy would give every copy detached duplicates
+# of those elements, so edits to the copy would silently never reach its saved package.
+_TEMPLATE_DOC = docx.Document()
+
+# Optional per-run styling properties, in the order add_styled_text_to_paragraph_soa unpacks them.
+_RUN_STYLE_KEYS = ("bold", "italic", "font_size_pt", "font_name", "font_color_rgb")
+# Normalised style key of a run with no direct formatting.
+_PLAIN_RUN_KEY = (False, False, None, None, None)
+
+
+def _first_invalid_run(runs: list) -> int:
+    """Returns the index of the first run that is not a dict with a 'text' key, or -1 if all are valid."""
+    # A plain loop avoids the generator frame that all(...) resumes once per run.
+    for i, run in enumerate(runs):
+        if type(run) is not dict or "text" not in run:
+            return i
+    return -1
+
+
+@functools.lru_cache(maxsize=64)
+def _pt(size: int) -> DocxPt:
+    """Returns a shared DocxPt for a font size; Length values are immutable ints."""
+    return DocxPt(size)
+
+
+@functools.lru_cache(maxsize=256)
+def _rgb(r: int, g: int, b: int) -> DocxRGBColor:
+    """Returns a shared DocxRGBColor for an RGB triple; RGBColor is an immutable tuple."""
+    return DocxRGBColor(r, g, b)
 
 
 class WordDocumentEditor:
@@ -17,29 +58,58 @@ class WordDocumentEditor:
     def __init__(self):
         self.doc = None
         self.current_filename = None
+        self._style_cache: Dict[str, Any] = {}
+        # Run style key -> <w:rPr> element to clone for runs with the same formatting.
+        self._rpr_cache: Dict[tuple, Any] = {}
 
     def _ensure_document_loaded(self):
         if self.doc is None:
             raise ValueError("No document loaded. Call create_docx_document() or load_docx_document() first.")
 
+    def _resolve(self, filename: str) -> str:
+        """Resolves a filename against the upload folder; absolute paths are kept as given."""
+        # Joining an absolute path onto UPLOAD_DIR yields that path, so no isabs() branch is needed.
+        return str(UPLOAD_DIR / filename)
+
+    def _get_style(self, name: Optional[str]):
+        """Resolves a style name against the current document once and reuses the style object afterwards."""
+        if name is None:
+            return None
+        style = self._style_cache.get(name)
+        if style is None:
+            style = self._style_cache[name] = self.doc.styles[name]
+        return style
+
     def create_document(self, filename: str = "new_document.docx") -> str:
         """Creates a new, blank Word document in memory."""
-        self.doc = docx.Document()
-        if os.path.isabs(filename):
-            self.current_filename = filename
-        else:
-            self.current_filename = os.path.join(UPLOAD_FOLDER_DOCX, filename)
-        # Add an initial empty paragraph to ensure the document is not completely empty
-        if not self.doc.paragraphs:
-            self.doc.add_paragraph("")
+        self.doc = copy.deepcopy(_TEMPLATE_DOC)
+        self._style_cache = {}
+        self._rpr_cache = {}
+        self.current_filename = self._resolve(filename)
+        # The default template has no paragraphs; add one so the document is not completely empty.
+        self.doc.add_paragraph("")
         return f"New Word document '{self.current_filename}' created and ready in memory."
 
     def load_document(self, filename: str) -> str:
         """Loads an existing Word document from the 'documents_fastmcp' directory."""
-        filepath = os.path.join(UPLOAD_FOLDER_DOCX, filename) if not os.path.isabs(filename) else filename
-        if not os.path.exists(filepath):
-            raise FileNotFoundError(f"Word document file '{filepath}' not found.")
-        self.doc = docx.Document(filepath)
+        filepath = self._resolve(filename)
+        # A single open() is both the existence check and the read handle.
+        try:
+            fd = os.open(filepath, os.O_RDONLY)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Word document file '{filepath}' not found.") from None
+        # Read the whole package in one go and let python-docx parse it from memory.
+        with os.fdopen(fd, 'rb') as f:
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            data = f.read()
+        try:
+            self.doc = docx.Document(io.BytesIO(data))
+        except zipfile.BadZipFile as e:
+            # Parsing from memory loses the path python-docx would otherwise report.
+            raise zipfile.BadZipFile(f"Word document file '{filepath}' is not a valid .docx package: {e}") from None
+        self._style_cache = {}
+        self._rpr_cache = {}
         self.current_filename = filepath
         return f"Word document '{self.current_filename}' loaded successfully."
 
@@ -48,20 +118,35 @@ class WordDocumentEditor:
         self._ensure_document_loaded()
         save_path = self.current_filename
         if filename:
-            save_path = os.path.join(UPLOAD_FOLDER_DOCX, filename) if not os.path.isabs(filename) else filename
+            save_path = self._resolve(filename)
             self.current_filename = save_path
         if not save_path:
             raise ValueError("Filename not specified for saving Word document.")
         save_dir = os.path.dirname(save_path)
-        if save_dir and not os.path.exists(save_dir):
-            os.makedirs(save_dir)
-        self.doc.save(save_path)
+        if save_dir and save_dir not in _known_dirs:
+            os.makedirs(save_dir, exist_ok=True)
+            _known_dirs.add(save_dir)
+        # Build the zip package in memory first, then hit the disk with a single write.
+        buf = io.BytesIO()
+        self.doc.save(buf)
+        try:
+            f = open(save_path, 'wb')
+        except FileNotFoundError:
+            if not save_dir:
+                raise
+            # A cached directory was removed while the server was running; recreate it and retry once.
+            _known_dirs.discard(save_dir)
+            os.makedirs(save_dir, exist_ok=True)
+            _known_dirs.add(save_dir)
+            f = open(save_path, 'wb')
+        with f:
+            f.write(buf.getbuffer())
         return f"Word document saved to '{save_path}'."
 
     def add_paragraph(self, text: str, style: Optional[str] = None) -> Dict[str, str]:
         """Adds a paragraph with optional style (e.g., 'Normal', 'BodyText', 'Heading1')."""
         self._ensure_document_loaded()
-        paragraph = self.doc.add_paragraph(str(text), style=style)
+        paragraph = self.doc.add_paragraph(str(text), style=self._get_style(style))
         return {"text_added": paragraph.text, "style_applied": style if style else "Normal (default)"}
 
     def add_heading(self, text: str, level: int = 1) -> Dict[str, Any]:
@@ -69,7 +154,9 @@ class WordDocumentEditor:
         self._ensure_document_loaded()
         if not (0 <= level <= 9):
             raise ValueError("Heading level must be between 0 and 9.")
-        heading = self.doc.add_heading(str(text), level=level)
+        # Same style names python-docx's add_heading uses, resolved through the cache.
+        heading_style = "Title" if level == 0 else f"Heading {level}"
+        heading = self.doc.add_paragraph(str(text), style=self._get_style(heading_style))
         return {"text_added": heading.text, "level": level}
 
     def add_styled_text_to_paragraph(self, text_runs: List[Dict[str, Any]], paragraph_style: Optional[str] = None) -> str:
@@ -78,23 +165,72 @@ class WordDocumentEditor:
         Each run in text_runs is a dict: {"text": "str", "bold": bool, "italic": bool, 
                                           "font_size_pt": int, "font_name": "str", "font_color_rgb": [R,G,B]}
         """
+        if not isinstance(text_runs, list):
+            raise ValueError("text_runs must be a list of dictionaries, each with a 'text' key.")
+        bad_index = _first_invalid_run(text_runs)
+        if bad_index != -1:
+            raise ValueError(f"text_runs must be a list of dictionaries, each with a 'text' key (run {bad_index} is not).")
+        runs_soa = {"text": [run_info.get("text", "") for run_info in text_runs]}
+        for key in _RUN_STYLE_KEYS:
+            runs_soa[key] = [run_info.get(key) for run_info in text_runs]
+        return self.add_styled_text_to_paragraph_soa(runs_soa, paragraph_style=paragraph_style)
+
+    def add_styled_text_to_paragraph_soa(self, runs_soa: Dict[str, List[Any]], paragraph_style: Optional[str] = None) -> str:
+        """
+        Adds a styled paragraph from column-oriented run data, one list per property:
+        {"text": [...], "bold": [...], "italic": [...], "font_size_pt": [...], "font_name": [...], "font_color_rgb": [...]}
+        Only "text" is required. A None entry leaves that property unset for the run.
+        """
         self._ensure_document_loaded()
-        p = self.doc.add_paragraph(style=paragraph_style)
+        texts = runs_soa["text"]
+        n = len(texts)
+        unset = [None] * n
+        columns = []
+        for key in _RUN_STYLE_KEYS:
+            column = runs_soa.get(key)
+            if column is None:
+                column = unset
+            if len(column) != n:
+                raise ValueError(f"Column '{key}' has {len(column)} entries, expected {n} to match 'text'.")
+            columns.append(column)
+        p = self.doc.add_paragraph(style=self._get_style(paragraph_style))
         full_text = []
-        for run_info in text_runs:
-            text = str(run_info.get("text", ""))
-            run = p.add_run(text)
-            full_text.append(text)
-            if run_info.get("bold"): run.bold = True
-            if run_info.get("italic"): run.italic = True
-            if "font_size_pt" in run_info: run.font.size = DocxPt(int(run_info["font_size_pt"])) # Use aliased DocxPt
-            if "font_name" in run_info: run.font.name = str(run_info["font_name"])
-            if "font_color_rgb" in run_info:
-                color = run_info["font_color_rgb"]
-                if isinstance(color, list) and len(color) == 3:
-                    run.font.color.rgb = DocxRGBColor(*color) # Use aliased DocxRGBColor
-                else:
-                    print(f"Warning: Invalid font_color_rgb format for run '{text}'. Expected [R,G,B].")
+        add_run = p.add_run
+        append = full_text.append
+        # Local names keep the per-run loop on LOAD_FAST instead of global lookups.
+        pt = _pt
+        rgb = _rgb
+        rpr_cache = self._rpr_cache
+        deepcopy = copy.deepcopy
+        for text, bold, italic, sz, name, color in zip(texts, *columns):
+            text = str(text)
+            run = add_run(text)
+            append(text)
+            if color is not None and not (type(color) is list and len(color) == 3):
+                print(f"Warning: Invalid font_color_rgb format for run '{text}'. Expected [R,G,B].")
+                color = None
+            key = (
+                bool(bold),
+                bool(italic),
+                None if sz is None else int(sz),
+                None if name is None else str(name),
+                None if color is None else tuple(color),
+            )
+            if key == _PLAIN_RUN_KEY:
+                continue
+            # Runs styled like an earlier one get a clone of its <w:rPr> instead of
+            # going through the property setters again.
+            cached_rpr = rpr_cache.get(key)
+            if cached_rpr is not None:
+                run._r.insert(0, deepcopy(cached_rpr))
+                continue
+            bold, italic, sz, name, color = key
+            if bold: run.bold = True
+            if italic: run.italic = True
+            if sz is not None: run.font.size = pt(sz)
+            if name is not None: run.font.name = name
+            if color is not None: run.font.color.rgb = rgb(*color)
+            rpr_cache[key] = deepcopy(run._r.rPr)
         return "".join(full_text)
 
 
@@ -103,40 +239,127 @@ class WordDocumentEditor:
         self._ensure_document_loaded()
         if rows <= 0 or cols <= 0:
             raise ValueError("Number of rows and columns must be positive.")
+        dims_message = "Data_list dimensions must match specified rows and columns."
+        if data_list and len(data_list) != rows:
+            raise ValueError(dims_message)
         table = self.doc.add_table(rows=rows, cols=cols, style=style)
         if data_list:
-            if len(data_list) != rows or not all(len(row_data) == cols for row_data in data_list):
-                raise ValueError("Data_list dimensions must match specified rows and columns.")
-            for r_idx, row_content in enumerate(data_list):
-                for c_idx, cell_content in enumerate(row_content):
-                    table.cell(r_idx, c_idx).text = str(cell_content)
+            tbl = table._tbl
+            # Fill cells straight from the <w:tr>/<w:tc> elements; table.cell() rebuilds
+            # the whole cell grid on every call, which is quadratic for big tables.
+            # Row widths are checked while filling, so data_list is only walked once.
+            for tr, row_content in zip(tbl.tr_lst, data_list):
+                if len(row_content) != cols:
+                    # Drop the half-filled table rather than leave it in the document.
+                    tbl.getparent().remove(tbl)
+                    raise ValueError(dims_message)
+                for tc, cell_content in zip(tr.tc_lst, row_content):
+                    tc.clear_content()
+                    tc.add_p().add_r().text = str(cell_content)
         return {"rows": rows, "cols": cols, "style": style, "data_populated": bool(data_list)}
 
     def add_picture(self, image_path: str, width_inch: Optional[float] = None, height_inch: Optional[float] = None) -> str:
         """Adds a picture from a local path, optionally scaled."""
         self._ensure_document_loaded()
-        if not os.path.exists(image_path):
-            raise FileNotFoundError(f"Image file not found at '{image_path}'.")
-
-        width_val = DocxInches(width_inch) if width_inch is not None else None
-        height_val = DocxInches(height_inch) if height_inch is not None else None
+        size_kwargs = {}
+        if width_inch is not None:
+            size_kwargs['width'] = DocxInches(width_inch)
+        if height_inch is not None:
+            size_kwargs['height'] = DocxInches(height_inch)
 
+        # python-docx opens the path itself, so that open() doubles as the existence check.
+        # Passing the path (not a stream) keeps the image's file name in the document.
+        body = self.doc.element.body
+        paragraphs_before = len(body.p_lst)
         try:
-            if width_val and height_val:
-                 self.doc.add_picture(image_path, width=width_val, height=height_val)
-            elif width_val:
-                 self.doc.add_picture(image_path, width=width_val)
-            elif height_val: 
-                 self.doc.add_picture(image_path, height=height_val)
-            else:
-                 self.doc.add_picture(image_path)
-            return f"Picture added from '{os.path.basename(image_path)}'."
+            self.doc.add_picture(image_path, **size_kwargs)
         except Exception as e:
+            # python-docx adds the picture's paragraph before reading the image; don't leave it behind.
+            p_lst = body.p_lst
+            if len(p_lst) > paragraphs_before:
+                body.remove(p_lst[-1])
+            if isinstance(e, FileNotFoundError):
+                raise FileNotFoundError(f"Image file not found at '{image_path}'.") from None
             raise ValueError(f"Could not add picture from '{image_path}': {e}")
+        return f"Picture added from '{os.path.basename(image_path)}'."
+
 
+    def apply_ops(self, ops: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Applies a batch of edit operations in order and returns each operation's result.
+        Each op is a dict with a "kind" key plus that method's arguments, e.g.
+        {"kind": "paragraph", "text": "...", "style": "Normal"} or {"kind": "heading", "text": "...", "level": 2}.
+        Kinds: paragraph, heading, styled_text, table, picture, page_break.
+        Operations before a failing one stay applied.
+        """
+        self._ensure_document_loaded()
+        handlers = {
+            "paragraph": self.add_paragraph,
+            "heading": self.add_heading,
+            "styled_text": self.add_styled_text_to_paragraph,
+            "table": self.add_table,
+            "picture": self.add_picture,
+            "page_break": self.add_page_break,
+        }
+        results = []
+        append = results.append
+        for i, op in enumerate(ops):
+            args = dict(op)
+            kind = args.pop("kind", None)
+            handler = handlers.get(kind)
+            if handler is None:
+                raise ValueError(f"Operation {i} has unknown kind '{kind}'. Expected one of: {', '.join(handlers)}.")
+            try:
+                append(handler(**args))
+            except Exception as e:
+                raise ValueError(f"Operation {i} ('{kind}') failed: {e}") from e
+        return results
+
+    def close(self) -> str:
+        """
+        Drops the in-memory document and releases its XML trees.
+        Best-effort mitigation for lxml memory that outlives discarded documents in long-running servers.
+        """
+        if self.doc is None:
+            return "No document was open."
+        for part in self.doc.part.package.iter_parts():
+            element = getattr(part, '_element', None)
+            if element is not None:
+                element.clear()
+        closed_filename = self.current_filename
+        self.doc = None
+        self.current_filename = None
+        self._style_cache = {}
+        self._rpr_cache = {}
+        gc.collect()
+        return f"Word document '{closed_filename}' closed and released from memory."
 
     def add_page_break(self) -> str:
         """Adds a manual page break."""
         self._ensure_document_loaded()
         self.doc.add_page_break()
         return "Page break added."
+
+
+# Editor owned by the current worker process; see run_in_worker.
+_worker_editor: Optional[WordDocumentEditor] = None
+
+
+def run_in_worker(method_name: str, kwargs: Dict[str, Any]):
+    """
+    Entry point for editor worker processes. Each worker keeps one WordDocumentEditor across calls
+    and returns the method's result together with the editor's current filename.
+    """
+    global _worker_editor
+    if _worker_editor is None:
+        _worker_editor = WordDocumentEditor()
+    try:
+        result = getattr(_worker_editor, method_name)(**kwargs)
+    except FileNotFoundError:
+        # Kept as is: tools such as add_docx_picture report missing files specially.
+        raise
+    except Exception as e:
+        # Exceptions are pickled back to the server and some (e.g. lxml's XMLSyntaxError) cannot be;
+        # send a plain ValueError that keeps the message instead.
+        raise ValueError(str(e)) from None
+    return result, _worker_editor.current_filename